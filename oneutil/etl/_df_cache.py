@@ -0,0 +1,58 @@
+"""
+On-disk cache of decoded DBN files.
+
+Each decoded file is stored as a zstd-compressed parquet file under `get_cache_dir("dbn")`,
+named after a hash of (bucket, key, etag), so an object that changes in S3 never hits a
+stale entry. The cache has no size limit, so it is disabled unless ONEUTIL_DBN_CACHE=1.
+Errors accessing the cache directory are logged and treated as cache misses.
+"""
+
+import hashlib
+import os
+
+import pyarrow.parquet as pq
+
+from oneutil.etl.util import get_cache_dir
+from oneutil.logging import logger
+
+ENABLED = os.environ.get("ONEUTIL_DBN_CACHE", "0") == "1"
+
+# Raised for an unusable cache directory; Path.home() raises RuntimeError without a home.
+_CACHE_ERRORS = (OSError, RuntimeError)
+
+
+def _table_path(bucket, key, etag):
+    digest = hashlib.sha1(f"{bucket}\0{key}\0{etag}".encode()).hexdigest()
+    return get_cache_dir("dbn") / f"{digest}.parquet"
+
+
+def load(bucket, key, etag):
+    """
+    Returns the cached Arrow table of an S3 object, or None if it isn't cached.
+    """
+
+    try:
+        path = _table_path(bucket, key, etag)
+        if not path.exists():
+            return None
+        table = pq.read_table(path, memory_map=True)
+    except _CACHE_ERRORS as e:
+        logger.warning(f"Could not read the DBN cache: {e}")
+        return None
+
+    logger.debug(f"DBN cache hit for bucket={bucket}, key={key}")
+    return table
+
+
+def save(bucket, key, etag, table):
+    """
+    Stores the Arrow table of an S3 object. Failing to write the cache is only logged.
+    """
+
+    try:
+        path = _table_path(bucket, key, etag)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        pq.write_table(table, tmp_path, compression="zstd", compression_level=3)
+        os.replace(tmp_path, path)
+    except _CACHE_ERRORS as e:
+        logger.warning(f"Could not write the DBN cache: {e}")
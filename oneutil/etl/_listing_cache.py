@@ -0,0 +1,124 @@
+"""
+On-disk cache of S3 listings.
+
+Each listing is stored as a parquet file with the columns (key, size, last_modified, etag)
+under `get_cache_dir("listings")`, named after a hash of (bucket, prefix, delimiter, region,
+access key), so listings are never shared between credentials.
+Listings older than ONEUTIL_S3_LISTING_DISK_TTL seconds are ignored, which bounds how long
+deleted or backfilled objects can go unnoticed. The cache is disabled unless it is set.
+Errors accessing the cache directory, e.g. a read-only home directory, are logged and
+treated as cache misses.
+"""
+
+import hashlib
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from oneutil.etl.util import get_cache_dir
+from oneutil.logging import logger
+
+# Maximum age in seconds of a cached listing; 0 disables the cache.
+MAX_AGE = float(os.environ.get("ONEUTIL_S3_LISTING_DISK_TTL", 0))
+
+# Raised for an unusable cache directory; Path.home() raises RuntimeError without a home.
+_CACHE_ERRORS = (OSError, RuntimeError)
+
+_SCHEMA = pa.schema(
+    [
+        ("key", pa.string()),
+        ("size", pa.int64()),
+        ("last_modified", pa.timestamp("us", tz="UTC")),
+        ("etag", pa.string()),
+    ]
+)
+
+
+def _listing_path(bucket, prefix, delimiter, region, access_key):
+    digest = hashlib.sha1(
+        f"{bucket}\0{prefix}\0{delimiter}\0{region}\0{access_key}".encode()
+    ).hexdigest()
+    return get_cache_dir("listings") / f"{digest}.parquet"
+
+
+def load(bucket, prefix, delimiter, region, access_key):
+    """
+    Returns the cached object entries of a listing, or None if it isn't cached or is older
+    than MAX_AGE.
+    """
+
+    if MAX_AGE <= 0:
+        return None
+
+    try:
+        path = _listing_path(bucket, prefix, delimiter, region, access_key)
+        if not path.exists():
+            return None
+        table = pq.read_table(path)
+    except _CACHE_ERRORS as e:
+        logger.warning(f"Could not read the listing cache: {e}")
+        return None
+
+    listed_at = float((table.schema.metadata or {}).get(b"listed_at", 0))
+    if time.time() - listed_at > MAX_AGE:
+        return None
+
+    return [
+        {"Key": key, "Size": size, "LastModified": last_modified, "ETag": etag}
+        for key, size, last_modified, etag in zip(
+            *(table.column(name).to_pylist() for name in _SCHEMA.names)
+        )
+    ]
+
+
+def save(bucket, prefix, delimiter, region, access_key, objects):
+    """
+    Stores the object entries of a listing. Failing to write the cache is only logged.
+    """
+
+    if MAX_AGE <= 0:
+        return
+
+    table = pa.table(
+        [
+            [obj["Key"] for obj in objects],
+            [obj["Size"] for obj in objects],
+            [obj["LastModified"] for obj in objects],
+            [obj["ETag"] for obj in objects],
+        ],
+        schema=_SCHEMA.with_metadata(
+            {
+                "bucket": bucket,
+                "prefix": prefix,
+                "delimiter": delimiter or "",
+                "listed_at": str(time.time()),
+            }
+        ),
+    )
+
+    try:
+        path = _listing_path(bucket, prefix, delimiter, region, access_key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except _CACHE_ERRORS as e:
+        logger.warning(f"Could not write the listing cache: {e}")
+
+
+def clear(prefix=None):
+    """
+    Removes the cached listings of prefixes starting with `prefix`, or all of them.
+    """
+
+    try:
+        # Don't create the directory just to find it empty, e.g. when the cache is disabled.
+        for path in get_cache_dir("listings", create=False).glob("*.parquet"):
+            if prefix is not None:
+                metadata = pq.read_schema(path).metadata or {}
+                if not metadata.get(b"prefix", b"").decode().startswith(prefix):
+                    continue
+            path.unlink(missing_ok=True)
+    except _CACHE_ERRORS as e:
+        logger.warning(f"Could not clear the listing cache: {e}")
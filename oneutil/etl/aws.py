@@ -1,8 +1,205 @@
-import boto3
+import asyncio
+import functools
+import io
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
+from oneutil.etl import _listing_cache as _disk_listing_cache
 from oneutil.logging import logger
 
+# Size of the connection pool of the shared S3 client. Callers running downloads in a
+# thread pool should keep threads * per-file concurrency within this limit.
+MAX_POOL_CONNECTIONS = 64
+
+# Client configuration shared by every S3 client/resource created by this module.
+# The pool is larger than boto3's default of 10 so the thread pools in this package
+# don't discard connections, and adaptive retries back off when S3 throttles.
+_S3_CONFIG = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    retries={"max_attempts": 10, "mode": "adaptive"},
+)
+
+# Files above the threshold are downloaded as concurrent ranged GETs of this chunk size.
+_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+_MULTIPART_CHUNKSIZE = 16 * 1024 * 1024
+
+# Seconds a listing stays in the in-process listing cache; 0 disables the cache.
+_LISTING_TTL = float(os.environ.get("ONEUTIL_S3_LISTING_TTL", 60))
+_LISTING_CACHE_MAXSIZE = 128
+
+# (bucket, prefix, delimiter, region, public_key) -> (expiry time, object entries)
+_listing_cache = {}
+_listing_cache_lock = threading.Lock()
+
+# boto3 sessions are not thread-safe, so creating clients/resources from a shared
+# session is serialized.
+_session_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=4)
+def _get_cached_s3_session(region, public_key, private_key):
+    """
+    Creates a boto3 session for the given region and credentials. The session is cached so
+    that credential resolution and service model loading only happen once per key set.
+    """
+
+    logger.debug(f"Creating a new boto3 session for region={region}")
+
+    return boto3.session.Session(
+        region_name=region,
+        aws_access_key_id=public_key,
+        aws_secret_access_key=private_key,
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _get_cached_s3_client(region, public_key, private_key):
+    """
+    Creates a low-level S3 client for the given region and credentials. The client is cached
+    and reused across calls so its HTTPS connection pool stays warm. boto3 clients are
+    thread-safe, so the same client may be shared between threads.
+    """
+
+    session = _get_cached_s3_session(region, public_key, private_key)
+    with _session_lock:
+        client = session.client("s3", config=_S3_CONFIG)
+
+    logger.debug("Successfully created the Amazon S3 client.")
+
+    return client
+
+
+def _get_access_key(region, public_key):
+    """
+    Returns the access key ID used for the given credentials, resolving the default credential
+    chain (environment, profile, instance role) if no key is given.
+    """
+
+    if public_key:
+        return public_key
+    credentials = _get_cached_s3_session(region, None, None).get_credentials()
+    return credentials.access_key if credentials is not None else None
+
+
+def _list_s3_objects(client, bucket, prefix="", delimiter=None):
+    """
+    Lists the objects under a prefix of an S3 bucket using the ListObjectsV2 paginator.
+
+    Returns:
+        list: The raw object entries ("Key", "Size", "LastModified", "ETag", ...) of every page.
+    """
+
+    kwargs = {"Bucket": bucket, "Prefix": prefix}
+    if delimiter:
+        kwargs["Delimiter"] = delimiter
+
+    paginator = client.get_paginator("list_objects_v2")
+    return [
+        obj for page in paginator.paginate(**kwargs) for obj in page.get("Contents", [])
+    ]
+
+
+def _is_listing_current(client, bucket, prefix, delimiter, last_key):
+    """
+    Checks that no object was added after `last_key`, the last key of a cached listing.
+    ListObjectsV2 returns keys in lexicographic order, so a single request starting after
+    that key is enough for append-only prefixes such as date-named files.
+    """
+
+    kwargs = {"Bucket": bucket, "Prefix": prefix, "StartAfter": last_key}
+    if delimiter:
+        kwargs["Delimiter"] = delimiter
+
+    response = client.list_objects_v2(**kwargs)
+    return not response.get("Contents") and not response.get("IsTruncated")
+
+
+def _list_s3_objects_cached(
+    client, region, public_key, bucket, prefix="", delimiter=None
+):
+    """
+    Same as `_list_s3_objects`, but serves repeated listings of the same (bucket, prefix)
+    from an in-process cache for ONEUTIL_S3_LISTING_TTL seconds (default 60). Listings are
+    cached per region and access key, so a caller never sees a listing made with other
+    credentials.
+
+    If ONEUTIL_S3_LISTING_DISK_TTL is set, listings are also persisted on disk for that many
+    seconds (see `oneutil.etl._listing_cache`), so that a new process only needs one request
+    to confirm that nothing was appended to the prefix. Objects deleted, backfilled before
+    the last key or overwritten in place are only noticed once the disk entry expires, or
+    after `invalidate_listing_cache`.
+    """
+
+    if _LISTING_TTL <= 0:
+        return _list_s3_objects(client, bucket, prefix, delimiter)
+
+    key = (bucket, prefix, delimiter, region, public_key)
+    with _listing_cache_lock:
+        entry = _listing_cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        logger.debug(f"Listing cache hit for bucket={bucket}, prefix={prefix}")
+        return entry[1]
+
+    # Key the disk cache by the resolved access key, as the default credentials can differ
+    # between processes.
+    access_key = _get_access_key(region, public_key)
+    objects = _disk_listing_cache.load(bucket, prefix, delimiter, region, access_key)
+    if objects and _is_listing_current(
+        client, bucket, prefix, delimiter, objects[-1]["Key"]
+    ):
+        logger.debug(f"Disk listing cache hit for bucket={bucket}, prefix={prefix}")
+    else:
+        objects = _list_s3_objects(client, bucket, prefix, delimiter)
+        if objects:
+            _disk_listing_cache.save(
+                bucket, prefix, delimiter, region, access_key, objects
+            )
+
+    with _listing_cache_lock:
+        _listing_cache.pop(key, None)
+        if len(_listing_cache) >= _LISTING_CACHE_MAXSIZE:
+            # Evict the oldest entry; dicts keep insertion order.
+            del _listing_cache[next(iter(_listing_cache))]
+        _listing_cache[key] = (time.monotonic() + _LISTING_TTL, objects)
+
+    return objects
+
+
+def invalidate_listing_cache(prefix: str = None):
+    """
+    Drops cached S3 listings, in memory and on disk, so that the next call lists the bucket again.
+
+    Parameters:
+        prefix (str, optional): Only drop the listings of prefixes starting with this value.
+            If not provided, the whole cache is cleared.
+    """
+
+    with _listing_cache_lock:
+        if prefix is None:
+            _listing_cache.clear()
+        else:
+            for key in [key for key in _listing_cache if key[1].startswith(prefix)]:
+                del _listing_cache[key]
+
+    _disk_listing_cache.clear(prefix)
+
+
+def refresh():
+    """
+    Clears the cached S3 sessions and clients, e.g. after the credentials have been rotated.
+    The next call to any function in this module creates them again.
+    """
+
+    _get_cached_s3_client.cache_clear()
+    _get_cached_s3_session.cache_clear()
+
 
 def get_s3_object(
     region: str = "us-east-1",
@@ -12,6 +209,9 @@ def get_s3_object(
     """
     Creates and returns an Amazon S3 resource object with the provided credentials and region.
 
+    The other functions in this module use the cached low-level S3 client instead, which is
+    cheaper to call; this resource is kept for callers that need the object-oriented API.
+
     Parameters:
         region (str): The AWS region to connect to. Defaults to "us-east-1".
         public_key (str): The AWS access key ID for authenticating with S3. If not provided,
@@ -26,13 +226,10 @@ def get_s3_object(
         botocore.exceptions.NoCredentialsError: If the provided credentials are invalid or missing.
     """
 
-    # Create an S3 resource object using the provided credentials and region.
-    s3 = boto3.resource(
-        service_name="s3",
-        region_name=region,
-        aws_access_key_id=public_key,
-        aws_secret_access_key=private_key,
-    )
+    # Create an S3 resource object from the cached session for the provided credentials and region.
+    session = _get_cached_s3_session(region, public_key, private_key)
+    with _session_lock:
+        s3 = session.resource("s3", config=_S3_CONFIG)
 
     logger.debug("Successfully created the Amazon S3 resource object.")
 
@@ -61,11 +258,11 @@ def get_s3_buckets(
     # Log the function call with provided arguments
     logger.debug(f"get_s3_buckets called with region={region}")
 
-    # Create an S3 resource object using the provided credentials and region.
-    s3 = get_s3_object(region, public_key, private_key)
+    # Get the cached S3 client for the provided credentials and region.
+    client = _get_cached_s3_client(region, public_key, private_key)
 
     # List all buckets in the specified region and store their names in a list.
-    buckets = [bucket.name for bucket in s3.buckets.all()]
+    buckets = [bucket["Name"] for bucket in client.list_buckets()["Buckets"]]
 
     # Log the number of buckets retrieved
     logger.debug(f"Number of buckets retrieved: {len(buckets)}")
@@ -98,14 +295,14 @@ def get_s3_bucket_files(
     # Log the function call with provided arguments
     logger.debug(f"get_s3_bucket_files called with bucket={bucket}, region={region}")
 
-    # Create an S3 resource object using the provided credentials and region.
-    s3 = get_s3_object(region, public_key, private_key)
-
-    # Get the S3 bucket object.
-    bucket_obj = s3.Bucket(bucket)
+    # Get the cached S3 client for the provided credentials and region.
+    client = _get_cached_s3_client(region, public_key, private_key)
 
     # List all objects (files) in the bucket and store their keys in a list.
-    files = [file.key for file in bucket_obj.objects.all()]
+    files = [
+        obj["Key"]
+        for obj in _list_s3_objects_cached(client, region, public_key, bucket)
+    ]
 
     # Log the number of files retrieved
     logger.debug(f"Number of files retrieved: {len(files)}")
@@ -120,10 +317,16 @@ def read_s3_bucket_file(
     region: str = "us-east-1",
     public_key: str = os.environ.get("s3_public_key"),
     private_key: str = os.environ.get("s3_private_key"),
+    size: int = None,
+    max_concurrency: int = 8,
 ):
     """
     Read the contents of a file from a specified AWS S3 bucket.
 
+    Files of unknown size or at least 8 MiB large are downloaded as up to `max_concurrency`
+    concurrent ranged GETs. Files known to be smaller are fetched with a single GET, which
+    avoids the HeadObject request and transfer threads of a managed download.
+
     Parameters:
         filename (str): The name of the file to read from the S3 bucket.
         bucket (str): The name of the S3 bucket. Default is 'onesquared-databento'.
@@ -132,6 +335,9 @@ def read_s3_bucket_file(
             it will be fetched from the environment variable "s3_public_key".
         private_key (str): The AWS secret access key for authenticating with S3. If not provided,
             it will be fetched from the environment variable "s3_private_key".
+        size (int, optional): The size of the file in bytes, e.g. from a listing, if known.
+        max_concurrency (int): The maximum number of concurrent ranged GETs for a large file.
+            Default is 8.
 
     Returns:
         bytes: The contents of the specified file as bytes.
@@ -145,22 +351,61 @@ def read_s3_bucket_file(
         f"read_s3_bucket_file called with bucket={bucket}, region={region}, filename={filename}"
     )
 
-    # Create an S3 resource object using the provided credentials and region.
-    s3 = get_s3_object(region, public_key, private_key)
-
-    # Get the S3 bucket object.
-    bucket_obj = s3.Bucket(bucket)
+    # Get the cached S3 client for the provided credentials and region.
+    client = _get_cached_s3_client(region, public_key, private_key)
 
-    # Get the S3 file object
-    file_obj = bucket_obj.Object(filename)
+    if size is not None and size < _MULTIPART_THRESHOLD:
+        # Small file: a single GET is enough.
+        return client.get_object(Bucket=bucket, Key=filename)["Body"].read()
 
-    # Extract file body
-    body = file_obj.get()["Body"].read()
+    # Download the file body; large files are fetched as concurrent ranged GETs.
+    config = TransferConfig(
+        multipart_threshold=_MULTIPART_THRESHOLD,
+        multipart_chunksize=_MULTIPART_CHUNKSIZE,
+        max_concurrency=max_concurrency,
+        use_threads=max_concurrency > 1,
+    )
+    buffer = io.BytesIO()
+    client.download_fileobj(bucket, filename, buffer, Config=config)
+    body = buffer.getvalue()
 
-    # Return the list of file keys.
+    # Return the file body.
     return body
 
 
+def get_s3_file_etag(
+    filename: str,
+    bucket: str = "onesquared-databento",
+    region: str = "us-east-1",
+    public_key: str = os.environ.get("s3_public_key"),
+    private_key: str = os.environ.get("s3_private_key"),
+):
+    """
+    Get the ETag of a file in a specified AWS S3 bucket without downloading it.
+
+    Parameters:
+        filename (str): The name of the file in the S3 bucket.
+        bucket (str): The name of the S3 bucket. Default is 'onesquared-databento'.
+        region (str): The AWS region where the bucket is located. Default is 'us-east-1'.
+        public_key (str): The AWS access key ID for authenticating with S3. If not provided,
+            it will be fetched from the environment variable "s3_public_key".
+        private_key (str): The AWS secret access key for authenticating with S3. If not provided,
+            it will be fetched from the environment variable "s3_private_key".
+
+    Returns:
+        str: The ETag of the specified file, which changes whenever its content changes.
+
+    Raises:
+        botocore.exceptions.NoCredentialsError: If the provided credentials are invalid or missing.
+        botocore.exceptions.ClientError: If there's an error accessing the S3 bucket or file.
+    """
+
+    # Get the cached S3 client for the provided credentials and region.
+    client = _get_cached_s3_client(region, public_key, private_key)
+
+    return client.head_object(Bucket=bucket, Key=filename)["ETag"]
+
+
 def get_files_in_s3_path(
     path: str,
     bucket: str = "onesquared-databento",
@@ -196,22 +441,164 @@ def get_files_in_s3_path(
         []
     """
 
-    # file_list = get_s3_bucket_files(bucket, region, public_key, private_key)
-    # # Filter the file list to include only files in the specified folder
-    # files_in_folder = [
-    #     filename for filename in file_list if filename.startswith(path)
-    # ]
-
-    # Create an S3 resource object using the provided credentials and region.
-    s3 = get_s3_object(region, public_key, private_key)
-
-    # Get the S3 bucket object.
-    bucket_obj = s3.Bucket(bucket)
-    files_in_folder = [
-        object_summary.key
-        for object_summary in bucket_obj.objects.filter(Prefix=path, Delimiter="/")
-        if not object_summary.key.endswith("/")
-    ]
+    objects = get_objects_in_s3_path(path, bucket, region, public_key, private_key)
+    files_in_folder = [obj["Key"] for obj in objects]
     num_files = len(files_in_folder)
     logger.debug(f"{num_files} files retrieved")
     return files_in_folder
+
+
+def get_objects_in_s3_path(
+    path: str,
+    bucket: str = "onesquared-databento",
+    region: str = "us-east-1",
+    public_key: str = os.environ.get("s3_public_key"),
+    private_key: str = os.environ.get("s3_private_key"),
+):
+    """
+    Same as `get_files_in_s3_path`, but returns the listing entries of the files instead of
+    only their names.
+
+    Returns:
+        List[dict]: The entries of the files in the specified folder, as returned by
+            ListObjectsV2, with at least the keys "Key", "Size", "LastModified" and "ETag".
+    """
+
+    # Get the cached S3 client for the provided credentials and region.
+    client = _get_cached_s3_client(region, public_key, private_key)
+
+    # Walk the listing pages with the low-level paginator, skipping folder placeholders.
+    return [
+        obj
+        for obj in _list_s3_objects_cached(
+            client, region, public_key, bucket, prefix=path, delimiter="/"
+        )
+        if not obj["Key"].endswith("/")
+    ]
+
+
+def get_files_in_s3_paths(
+    paths: list,
+    bucket: str = "onesquared-databento",
+    region: str = "us-east-1",
+    public_key: str = os.environ.get("s3_public_key"),
+    private_key: str = os.environ.get("s3_private_key"),
+    max_workers: int = 32,
+):
+    """
+    Retrieves the file names present under several prefixes of an Amazon S3 bucket.
+
+    ListObjectsV2 pagination is sequential within a prefix, so each prefix is listed in its
+    own thread (sharing the cached S3 client) and the results are merged. Listing a set of
+    known prefixes therefore takes roughly as long as the slowest one instead of their sum.
+
+    Parameters:
+        paths (list): The prefixes for which to retrieve file names.
+        bucket (str, optional): The name of the S3 bucket. Default is "onesquared-databento".
+        region (str, optional): The AWS region where the S3 bucket is located. Default is "us-east-1".
+        public_key (str, optional): The public access key for the AWS account. If not provided,
+                                   it will be retrieved from the environment variable "s3_public_key".
+        private_key (str, optional): The private access key for the AWS account. If not provided,
+                                     it will be retrieved from the environment variable "s3_private_key".
+        max_workers (int, optional): The maximum number of prefixes listed concurrently. Default is 32.
+
+    Returns:
+        List[str]: The file names found under each prefix, in the order of `paths`.
+
+    Example:
+        >>> get_files_in_s3_paths(["my_data_folder/20230801", "my_data_folder/20230802"])
+        ['my_data_folder/20230801.dbn', 'my_data_folder/20230802.dbn']
+    """
+
+    logger.debug(
+        f"get_files_in_s3_paths called with {len(paths)} paths, bucket={bucket}"
+    )
+
+    objects = get_objects_in_s3_paths(
+        paths, bucket, region, public_key, private_key, max_workers
+    )
+    return [obj["Key"] for obj in objects]
+
+
+def get_objects_in_s3_paths(
+    paths: list,
+    bucket: str = "onesquared-databento",
+    region: str = "us-east-1",
+    public_key: str = os.environ.get("s3_public_key"),
+    private_key: str = os.environ.get("s3_private_key"),
+    max_workers: int = 32,
+):
+    """
+    Same as `get_files_in_s3_paths`, but returns the listing entries of the files instead of
+    only their names (see `get_objects_in_s3_path`).
+    """
+
+    def list_path(path):
+        return get_objects_in_s3_path(path, bucket, region, public_key, private_key)
+
+    if len(paths) < 2 or max_workers < 2:
+        listings = [list_path(path) for path in paths]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            listings = list(executor.map(list_path, paths))
+
+    return [obj for listing in listings for obj in listing]
+
+
+async def read_s3_bucket_files_async(
+    filenames: list,
+    bucket: str = "onesquared-databento",
+    region: str = "us-east-1",
+    public_key: str = os.environ.get("s3_public_key"),
+    private_key: str = os.environ.get("s3_private_key"),
+):
+    """
+    Read the contents of several files from a specified AWS S3 bucket concurrently using asyncio.
+
+    All GET requests are issued at once against a single aioboto3 client, which keeps many
+    requests in flight without a thread per request. Requires the optional `aioboto3`
+    dependency (`pip install oneutil[async]`).
+
+    Parameters:
+        filenames (list): The names of the files to read from the S3 bucket.
+        bucket (str): The name of the S3 bucket. Default is 'onesquared-databento'.
+        region (str): The AWS region where the bucket is located. Default is 'us-east-1'.
+        public_key (str): The AWS access key ID for authenticating with S3. If not provided,
+            it will be fetched from the environment variable "s3_public_key".
+        private_key (str): The AWS secret access key for authenticating with S3. If not provided,
+            it will be fetched from the environment variable "s3_private_key".
+
+    Returns:
+        list: The contents of the specified files as bytes, in the order of `filenames`.
+
+    Raises:
+        ImportError: If aioboto3 is not installed.
+        botocore.exceptions.ClientError: If there's an error accessing the S3 bucket or a file.
+    """
+
+    try:
+        import aioboto3
+    except ImportError as e:
+        raise ImportError(
+            "read_s3_bucket_files_async requires aioboto3; install it with `pip install oneutil[async]`"
+        ) from e
+
+    logger.debug(
+        f"read_s3_bucket_files_async called with {len(filenames)} files, bucket={bucket}, region={region}"
+    )
+
+    session = aioboto3.Session(
+        region_name=region,
+        aws_access_key_id=public_key,
+        aws_secret_access_key=private_key,
+    )
+    config = _S3_CONFIG.merge(Config(max_pool_connections=128))
+
+    async with session.client("s3", config=config) as client:
+
+        async def read_file(filename):
+            response = await client.get_object(Bucket=bucket, Key=filename)
+            async with response["Body"] as stream:
+                return await stream.read()
+
+        return await asyncio.gather(*(read_file(filename) for filename in filenames))
@@ -1,15 +1,160 @@
+import asyncio
+import contextlib
+import multiprocessing
 import os
-from datetime import date
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
 import databento
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
-from oneutil.etl.util import extract_date_from_string
+from oneutil.etl import _df_cache
+from oneutil.etl.util import filter_files_by_date
 from oneutil.logging import logger
 from oneutil.etl.aws import (
     read_s3_bucket_file,
-    get_files_in_s3_path,
+    get_s3_file_etag,
+    get_objects_in_s3_path,
+    get_objects_in_s3_paths,
+    read_s3_bucket_files_async,
+    MAX_POOL_CONNECTIONS,
 )
 
+# Recurring string columns of DBN data, returned as categoricals by read_databento_from_s3
+_CATEGORICAL_COLUMNS = ("symbol", "action", "side")
+
+
+def _dbn_bytes_to_df(body):
+    """
+    Decodes the bytes of a DBN file into a DataFrame.
+    """
+
+    # Create a Databento store from the bytes read from the S3 bucket
+    dbn = databento.DBNStore.from_bytes(body)
+
+    # Convert the Databento store to a DataFrame
+    return dbn.to_df()
+
+
+def _dbn_bytes_to_table(body):
+    """
+    Decodes the bytes of a DBN file into an Arrow table; the DataFrame index is kept as a column.
+    """
+
+    return pa.Table.from_pandas(_dbn_bytes_to_df(body))
+
+
+def _get_table_from_s3(
+    filename,
+    bucket,
+    region,
+    public_key,
+    private_key,
+    decode=_dbn_bytes_to_table,
+    size=None,
+    max_concurrency=8,
+    etag=None,
+):
+    """
+    Same as `get_df_from_s3`, but returns the data as an Arrow table. If enabled, decoded files
+    are cached on disk (see `oneutil.etl._df_cache`), keyed by the ETag of the S3 object, which
+    is looked up with a HEAD request unless given. `decode` turns the downloaded bytes into the
+    table; `size` and `max_concurrency` are passed on to `read_s3_bucket_file`.
+    """
+
+    def read_file():
+        return read_s3_bucket_file(
+            filename, bucket, region, public_key, private_key, size, max_concurrency
+        )
+
+    if not _df_cache.ENABLED:
+        return decode(read_file())
+
+    if etag is None:
+        etag = get_s3_file_etag(filename, bucket, region, public_key, private_key)
+    table = _df_cache.load(bucket, filename, etag)
+    if table is None:
+        table = decode(read_file())
+        _df_cache.save(bucket, filename, etag, table)
+
+    return table
+
+
+def _dictionary_encode(table, names):
+    """
+    Dictionary encodes the given string columns of a table, if present, so that pandas
+    converts them to categoricals instead of one Python string per row.
+    """
+
+    for name in names:
+        index = table.schema.get_field_index(name)
+        field_type = table.schema.field(index).type if index >= 0 else None
+        if field_type is not None and (
+            pa.types.is_string(field_type) or pa.types.is_large_string(field_type)
+        ):
+            table = table.set_column(index, name, pc.dictionary_encode(table[name]))
+    return table
+
+
+def _to_utc_scalar(ts, type):
+    """
+    Converts a timestamp-like value to an Arrow scalar of the given type; naive values are UTC.
+    """
+
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return pa.scalar(ts, type=type)
+
+
+def _filter_table(table, columns=None, symbols=None, start_ts=None, end_ts=None):
+    """
+    Keeps the rows of a decoded DBN table whose symbol is in `symbols` and whose ts_event is in
+    [start_ts, end_ts), and the given columns (plus the index column). None means no filter.
+    Raises ValueError for columns that don't exist or are the index, which is not returned, and
+    for symbols if there is no symbol column. A single symbol may be given as a string.
+    """
+
+    mask = None
+    if symbols is not None:
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        if "symbol" not in table.column_names:
+            raise ValueError("Cannot filter by symbols; the data has no symbol column")
+        mask = pc.is_in(
+            table["symbol"].cast(pa.string()),
+            value_set=pa.array(list(symbols), pa.string()),
+        )
+    if start_ts is not None:
+        ts_type = table.schema.field("ts_event").type
+        in_range = pc.greater_equal(
+            table["ts_event"], _to_utc_scalar(start_ts, ts_type)
+        )
+        mask = in_range if mask is None else pc.and_(mask, in_range)
+    if end_ts is not None:
+        ts_type = table.schema.field("ts_event").type
+        in_range = pc.less(table["ts_event"], _to_utc_scalar(end_ts, ts_type))
+        mask = in_range if mask is None else pc.and_(mask, in_range)
+    if mask is not None:
+        table = table.filter(mask)
+
+    if columns is not None:
+        index_columns = table.schema.pandas_metadata["index_columns"]
+        invalid = [
+            name
+            for name in columns
+            if name in index_columns or name not in table.column_names
+        ]
+        if invalid:
+            raise ValueError(
+                f"Cannot select columns {invalid}; available columns are "
+                f"{[name for name in table.column_names if name not in index_columns]}"
+            )
+        table = table.select(list(columns) + index_columns)
+
+    return table
+
 
 def get_df_from_s3(
     filename: str,
@@ -50,17 +195,11 @@ def get_df_from_s3(
         f"get_df_from_s3 called with filename={filename}, bucket={bucket}, region={region}"
     )
 
-    # Read the file content from the S3 bucket using the provided filename
-    body = read_s3_bucket_file(filename, bucket, region, public_key, private_key)
+    # Read the decoded file from the local cache, or from the S3 bucket on a miss
+    table = _get_table_from_s3(filename, bucket, region, public_key, private_key)
 
-    # Create a Databento store from the bytes read from the S3 bucket
-    dbn = databento.DBNStore.from_bytes(body)
-
-    # Convert the Databento store to a DataFrame
-    df = dbn.to_df()
-
-    # Return the DataFrame
-    return df
+    # Convert the table to a DataFrame and return it
+    return table.to_pandas()
 
 
 def read_databento_from_s3(
@@ -71,6 +210,15 @@ def read_databento_from_s3(
     region: str = "us-east-1",
     public_key: str = os.environ.get("s3_public_key"),
     private_key: str = os.environ.get("s3_private_key"),
+    max_workers: int = 32,
+    list_by_day: bool = False,
+    day_prefix_format: str = "%Y%m%d",
+    use_async: bool = False,
+    columns: list = None,
+    symbols: list = None,
+    start_ts=None,
+    end_ts=None,
+    decode_workers: int = 0,
 ):
     """
     Reads a sequence of files from an S3 folder between given start date (sd) and end date (ed).
@@ -80,39 +228,142 @@ def read_databento_from_s3(
         folder (str): The name of the S3 folder.
         sd (datetime.date): The start date.
         ed (datetime.date): The end date.
+        max_workers (int): The maximum number of files downloaded concurrently. Default is 32.
+        list_by_day (bool): If True, only the prefix `{path}/{day_prefix_format}` of each day in
+            the date range is listed, concurrently, instead of the whole folder, and no date is
+            parsed from the file names. Default is False.
+        day_prefix_format (str): The strftime format of the per-day prefix used by `list_by_day`,
+            e.g. "%Y%m%d" for `path/YYYYMMDD...` or "%Y/%m/%d/" for `path/YYYY/MM/DD/...`.
+            Default is "%Y%m%d".
+        use_async (bool): If True, all files are downloaded at once with asyncio (aioboto3)
+            instead of a thread pool. Suited to many small files; requires `oneutil[async]`
+            and cannot be used from a running event loop. Files downloaded this way bypass
+            the local cache of decoded files. Default is False.
+        columns (list): If provided, only these columns are returned. The ts_recv index is
+            never returned and cannot be selected.
+        symbols (list or str): If provided, only the records of these symbols are returned.
+        start_ts (pandas.Timestamp or str): If provided, only the records with a ts_event at or
+            after this time are returned. Naive timestamps are taken as UTC.
+        end_ts (pandas.Timestamp or str): If provided, only the records with a ts_event before
+            this time are returned. Naive timestamps are taken as UTC.
+        decode_workers (int): If greater than 0, the files are decoded in a pool of this many
+            processes, e.g. `os.cpu_count()`, so decoding scales past the GIL while the
+            download threads keep fetching. The processes are started with the forkserver
+            (or spawn) method, so scripts using it need an `if __name__ == "__main__":` guard.
+            Default is 0 (decode in the download threads).
 
     Returns:
         pandas.DataFrame: The DataFrame containing the combined data from the specified files.
+            The symbol, action and side columns are categoricals.
 
     Raises:
         FileNotFoundError: If any of the specified files are not found in the S3 bucket.
+        ValueError: If any of the given columns don't exist in the data, or symbols are given
+            for data without a symbol column.
         Exception: If there are any errors during the conversion to DataFrame.
     """
 
     logger.debug(f"read_databento_from_s3 called with path={path}, sd={sd}, ed={ed}")
 
-    # Get a list of all the files in the S3 folder
-    files_in_folder = get_files_in_s3_path(
-        path, bucket, region, public_key, private_key
-    )
+    if list_by_day:
+        # List only the prefix of each day in the date range; every key found is in range.
+        days = [sd + timedelta(days=i) for i in range((ed - sd).days + 1)]
+        folder = path.rstrip("/")
+        day_paths = [f"{folder}/{day.strftime(day_prefix_format)}" for day in days]
+        objects_to_read = get_objects_in_s3_paths(
+            day_paths, bucket, region, public_key, private_key, max_workers
+        )
+    else:
+        # Get a list of all the files in the S3 folder
+        objects_in_folder = get_objects_in_s3_path(
+            path, bucket, region, public_key, private_key
+        )
 
-    # Filter files based on date range (sd and ed)
-    # for file in files_in_folder:
-    #     print(extract_date_from_filename(file))
-    files_to_read = []
-    for filename in files_in_folder:
-        file_date = extract_date_from_string(filename)
-        if file_date is not None and (sd <= file_date <= ed):
-            files_to_read.append(filename)
+        # Filter files based on date range (sd and ed)
+        objects_by_key = {obj["Key"]: obj for obj in objects_in_folder}
+        files_in_range = filter_files_by_date(list(objects_by_key), sd, ed)
+        objects_to_read = [objects_by_key[key] for key in files_in_range]
+    files_to_read = [obj["Key"] for obj in objects_to_read]
     if not files_to_read:
         raise FileNotFoundError(f"No files found in the date range {sd} to {ed}")
 
-    # Read data from the selected files and combine them into a DataFrame
-    dfs_to_concat = []
-    for filename in files_to_read:
-        df = get_df_from_s3(filename, bucket, region, public_key, private_key)
-        dfs_to_concat.append(df)
+    def filter_table(table):
+        # Filter each file before the concatenation so unwanted data is freed early
+        return _filter_table(table, columns, symbols, start_ts, end_ts)
+
+    # Read data from the selected files as Arrow tables, which are concatenated without
+    # copying and converted to a single DataFrame, without the per-file index, at the end.
+    # The downloads are independent, so they are fanned out over a thread pool
+    # sharing the cached S3 client; map() preserves the order of the files.
+    # With decode_workers, each download thread hands its bytes to the process pool and
+    # waits for the table, so at most max_workers undecoded files are held at a time.
+    if decode_workers > 0:
+        # The workers start on the first submit, from a download thread. Forking while other
+        # threads hold locks (e.g. of the connection pool) can deadlock the child, so they are
+        # started from a fork server, or spawned where it isn't available.
+        start_method = (
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        decoders = ProcessPoolExecutor(
+            max_workers=decode_workers,
+            mp_context=multiprocessing.get_context(start_method),
+        )
+    else:
+        decoders = contextlib.nullcontext()
+
+    with decoders:
+        if decode_workers > 0:
+
+            def decode(body):
+                return decoders.submit(_dbn_bytes_to_table, body).result()
+
+        else:
+            decode = _dbn_bytes_to_table
+
+        # Keep the ranged GETs of the parallel downloads within the client's connection pool
+        parallel_downloads = max(1, min(max_workers, len(files_to_read)))
+        file_concurrency = max(1, min(8, MAX_POOL_CONNECTIONS // parallel_downloads))
+
+        def read_file(obj):
+            table = _get_table_from_s3(
+                obj["Key"],
+                bucket,
+                region,
+                public_key,
+                private_key,
+                decode,
+                obj["Size"],
+                file_concurrency,
+                obj["ETag"],
+            )
+            return filter_table(table)
+
+        if use_async:
+            bodies = asyncio.run(
+                read_s3_bucket_files_async(
+                    files_to_read, bucket, region, public_key, private_key
+                )
+            )
+            if decode_workers > 0:
+                decoded = decoders.map(_dbn_bytes_to_table, bodies)
+            else:
+                decoded = map(_dbn_bytes_to_table, bodies)
+            tables = [filter_table(table) for table in decoded]
+            del bodies
+        elif len(files_to_read) < 2 or max_workers < 2:
+            tables = [read_file(obj) for obj in objects_to_read]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                tables = list(executor.map(read_file, objects_to_read))
 
-    combined_df = pd.concat(dfs_to_concat, ignore_index=True)
+    combined_table = pa.concat_tables(tables, promote_options="default")
+    combined_table = _dictionary_encode(combined_table, _CATEGORICAL_COLUMNS)
+    # Drop the per-file tables so self_destruct can free each column once converted
+    del tables
+    combined_df = combined_table.to_pandas(
+        self_destruct=True, split_blocks=True, use_threads=True
+    ).reset_index(drop=True)
 
     return combined_df
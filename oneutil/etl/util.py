@@ -1,6 +1,54 @@
-from datetime import datetime
+from datetime import date
+from pathlib import Path
+import os
 import re
 
+import pandas as pd
+
+# Date patterns, compiled once at import time
+_DATE_DEFAULT = re.compile(r"\d{8}")
+_DATE_HYPHEN = re.compile(r"\d{4}-\d{2}-\d{2}")
+_DATE_UNDERSCORE = re.compile(r"\d{4}_\d{2}_\d{2}")
+
+
+def get_cache_dir(name, create=True):
+    """
+    Returns the directory of a local oneutil cache, creating it if needed.
+
+    Caches live under the directory given by the environment variable ONEUTIL_CACHE_DIR,
+    which defaults to ~/.cache/oneutil.
+
+    Parameters:
+        name (str): The name of the cache, used as the name of its subdirectory.
+        create (bool): Whether to create the directory if it doesn't exist. Default is True.
+
+    Returns:
+        pathlib.Path: The directory of the cache.
+    """
+
+    root = os.environ.get("ONEUTIL_CACHE_DIR") or Path.home() / ".cache" / "oneutil"
+    cache_dir = Path(root) / name
+    if create:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def _parse_date(date_str, year_pos, month_pos, day_pos):
+    """
+    Builds a date from the year, month and day digits starting at the given positions.
+    Slicing the digits is much cheaper than datetime.strptime, which re-parses the
+    format string on every call. Returns None if the digits are not a valid date.
+    """
+
+    try:
+        return date(
+            int(date_str[year_pos : year_pos + 4]),
+            int(date_str[month_pos : month_pos + 2]),
+            int(date_str[day_pos : day_pos + 2]),
+        )
+    except ValueError:
+        return None
+
 
 def extract_date_from_string(filename, format="default"):
     """
@@ -15,57 +63,123 @@ def extract_date_from_string(filename, format="default"):
 
     Returns:
         datetime.date or None: If the date pattern is found and successfully extracted from the filename,
-        the function returns a datetime.date object representing the date. If no date pattern is found
+        the function returns a datetime.date object representing the date. If no valid date is found
         in the filename, the function returns None.
 
     Example:
-        >>> extract_date_from_filename("data_report_20230801.csv")
+        >>> extract_date_from_string("data_report_20230801.csv")
         datetime.date(2023, 8, 1)
 
-        >>> extract_date_from_filename("report.txt")
+        >>> extract_date_from_string("report.txt")
         None
     """
 
-    if format == "default":
-        return extract_date_default(filename)
-    if format == "hyphen":
-        return extract_date_hyphen(filename)
-    if format == "underscore":
-        return extract_date_underscore(filename)
+    extract_date = _DATE_EXTRACTORS.get(format)
+    if extract_date is None:
+        return None
+    return extract_date(filename)
+
+
+def extract_date_from_filename(filename):
+    """
+    Kept for backward compatibility; same as `extract_date_from_string(filename, "default")`.
+    """
+
+    return extract_date_from_string(filename, "default")
 
 
 def extract_date_default(filename):
     # Regular expression pattern to find the date part in the filename
     # default:  yyyyddd format
-    date_pattern = r"\d{8}"
     # Search for the date pattern in the filename
-    match = re.search(date_pattern, filename)
+    match = _DATE_DEFAULT.search(filename)
     if match:
         date_str = match.group()
-        # Convert the date string to a datetime object
-        date_object = datetime.strptime(date_str, "%Y%m%d").date()
-        return date_object
+        # Convert the date string to a date object
+        return _parse_date(date_str, 0, 4, 6)
     else:
         return None
 
 
 def extract_date_hyphen(filename):
-    match = re.search(r"\d{4}-\d{2}-\d{2}", filename)
+    match = _DATE_HYPHEN.search(filename)
     if match:
         date_str = match.group()
-        # Convert the date string to a datetime object
-        date_object = datetime.strptime(date_str, "%Y-%m-%d").date()
-        return date_object
+        # Convert the date string to a date object
+        return _parse_date(date_str, 0, 5, 8)
     else:
         return None
 
 
 def extract_date_underscore(filename):
-    match = re.search(r"\d{4}_\d{2}_\d{2}", filename)
+    match = _DATE_UNDERSCORE.search(filename)
     if match:
         date_str = match.group()
-        # Convert the date string to a datetime object
-        date_object = datetime.strptime(date_str, "%Y_%m_%d").date()
-        return date_object
+        # Convert the date string to a date object
+        return _parse_date(date_str, 0, 5, 8)
     else:
         return None
+
+
+# Dispatch table used by extract_date_from_string
+_DATE_EXTRACTORS = {
+    "default": extract_date_default,
+    "hyphen": extract_date_hyphen,
+    "underscore": extract_date_underscore,
+}
+
+# Patterns used by filter_files_by_date, by format
+_DATE_PATTERNS = {
+    "default": _DATE_DEFAULT,
+    "hyphen": _DATE_HYPHEN,
+    "underscore": _DATE_UNDERSCORE,
+}
+
+
+def _date_key(d):
+    """
+    Returns a date as a YYYYMMDD integer, which orders the same way as the date.
+    """
+
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def filter_files_by_date(filenames, sd, ed, format="default"):
+    """
+    Keeps the filenames whose date (as found by extract_date_from_string) falls between the start
+    date (sd) and the end date (ed), inclusive.
+
+    The dates of all filenames are extracted and compared in a single pass with pandas string and
+    datetime operations instead of a Python loop, which matters for listings with many files.
+
+    Parameters:
+        filenames (list): The filenames to filter.
+        sd (datetime.date): The start date.
+        ed (datetime.date): The end date.
+        format (str): The date format in the filenames: "default", "hyphen" or "underscore".
+
+    Returns:
+        list: The filenames in the date range, in their original order.
+
+    Example:
+        >>> filter_files_by_date(["a_20230731.dbn", "a_20230801.dbn"], date(2023, 8, 1), date(2023, 8, 31))
+        ['a_20230801.dbn']
+    """
+
+    pattern = _DATE_PATTERNS.get(format)
+    if pattern is None:
+        return []
+
+    names = pd.Series(filenames, dtype=object)
+    date_str = names.str.extract(f"({pattern.pattern})", expand=False).str.replace(
+        r"\D", "", regex=True
+    )
+
+    # Compare the dates as YYYYMMDD integers, then only check that the few filenames in range
+    # hold a valid calendar date instead of parsing the dates of every filename.
+    keys = pd.to_numeric(date_str, errors="coerce")
+    in_range = (keys >= _date_key(sd)) & (keys <= _date_key(ed))
+    date_str = date_str[in_range]
+    is_valid = pd.to_datetime(date_str, format="%Y%m%d", errors="coerce").notna()
+
+    return names[in_range][is_valid].tolist()
@@ -8,9 +8,13 @@ setup(
     long_description_content_type="text/markdown",
     author="Shawn Lin",
     packages=find_packages(),
-    python_requires=">=3.6",
+    python_requires=">=3.8",
     install_requires=[
-        "boto3>=1.18.0",
+        "boto3>=1.26.0",
         "databento>=0.16.0",
+        "pyarrow>=14.0.0",
     ],
+    extras_require={
+        "async": ["aioboto3>=11.0.0"],
+    },
 )
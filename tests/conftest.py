@@ -0,0 +1,105 @@
+from collections import Counter
+
+import boto3
+import databento_dbn
+import pandas as pd
+import pytest
+from moto import mock_aws
+
+from oneutil.etl import aws
+
+BUCKET = "onesquared-databento"
+
+
+@pytest.fixture(autouse=True)
+def _isolate_caches(tmp_path, monkeypatch):
+    monkeypatch.setenv("ONEUTIL_CACHE_DIR", str(tmp_path / "cache"))
+    aws.invalidate_listing_cache()
+    yield
+    aws.invalidate_listing_cache()
+
+
+@pytest.fixture
+def aws_credentials(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+
+
+@pytest.fixture
+def s3(aws_credentials):
+    """A mocked S3 client with an empty default bucket."""
+
+    with mock_aws():
+        aws.refresh()
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    aws.refresh()
+
+
+@pytest.fixture
+def s3_server(aws_credentials, monkeypatch):
+    """
+    Same as `s3`, but backed by a local moto server, for clients such as aioboto3 that
+    moto cannot mock in-process. Requires `moto[server]`.
+    """
+
+    server_module = pytest.importorskip("moto.server")
+    server = server_module.ThreadedMotoServer(
+        ip_address="127.0.0.1", port=0, verbose=False
+    )
+    server.start()
+    host, port = server.get_host_and_port()
+    monkeypatch.setenv("AWS_ENDPOINT_URL_S3", f"http://{host}:{port}")
+    aws.refresh()
+    try:
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    finally:
+        server.stop()
+        aws.refresh()
+
+
+@pytest.fixture
+def s3_calls(s3):
+    """Counts the S3 operations sent by the cached client."""
+
+    calls = Counter()
+    client = aws._get_cached_s3_client("us-east-1", None, None)
+    client.meta.events.register(
+        "before-call.s3.*", lambda model, **kwargs: calls.update([model.name])
+    )
+    return calls
+
+
+def make_dbn(day, n=3):
+    """Encodes n trades on the given day as DBN bytes."""
+
+    start = pd.Timestamp(day, tz="UTC").value
+    metadata = databento_dbn.Metadata(
+        dataset="GLBX.MDP3",
+        start=start,
+        stype_in=databento_dbn.SType.RAW_SYMBOL,
+        stype_out=databento_dbn.SType.INSTRUMENT_ID,
+        schema=databento_dbn.Schema.TRADES,
+        symbols=["ESZ3"],
+        end=start + 86_400 * 10**9,
+        mappings=[],
+    )
+    body = bytes(metadata.encode())
+    for i in range(n):
+        record = databento_dbn.TradeMsg(
+            publisher_id=1,
+            instrument_id=42,
+            ts_event=start + i,
+            price=4_512_250_000_000 + i,
+            size=i + 1,
+            action=databento_dbn.Action.TRADE,
+            side=databento_dbn.Side.ASK if i % 2 else databento_dbn.Side.BID,
+            depth=0,
+            ts_recv=start + i + 5,
+        )
+        body += bytes(record)
+    return body
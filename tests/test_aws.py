@@ -0,0 +1,130 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+from oneutil.etl import aws
+
+from conftest import BUCKET
+
+
+def test_read_small_file_with_known_size_uses_single_get(s3, s3_calls):
+    s3.put_object(Bucket=BUCKET, Key="a.dbn", Body=b"abc")
+
+    body = aws.read_s3_bucket_file("a.dbn", public_key=None, private_key=None, size=3)
+
+    assert body == b"abc"
+    assert s3_calls == Counter({"GetObject": 1})
+
+
+def test_read_file_with_unknown_size(s3, s3_calls):
+    s3.put_object(Bucket=BUCKET, Key="a.dbn", Body=b"abc")
+
+    assert aws.read_s3_bucket_file("a.dbn", public_key=None, private_key=None) == b"abc"
+    # Without a size, the managed transfer first looks it up with a HEAD request.
+    assert s3_calls == Counter({"HeadObject": 1, "GetObject": 1})
+
+
+def test_read_files_async(s3_server):
+    pytest.importorskip("aioboto3")
+    s3_server.put_object(Bucket=BUCKET, Key="a.dbn", Body=b"abc")
+    s3_server.put_object(Bucket=BUCKET, Key="b.dbn", Body=b"defg")
+
+    bodies = asyncio.run(
+        aws.read_s3_bucket_files_async(
+            ["b.dbn", "a.dbn"], BUCKET, public_key=None, private_key=None
+        )
+    )
+    assert bodies == [b"defg", b"abc"]
+
+
+@pytest.fixture
+def dated_files(s3):
+    for key in ("p/x-20230801", "p/x-20230803"):
+        s3.put_object(Bucket=BUCKET, Key=key, Body=b"abc")
+    assert aws.get_files_in_s3_path("p/") == ["p/x-20230801", "p/x-20230803"]
+    return s3
+
+
+def test_listing_cache_is_not_shared_across_credentials(dated_files):
+    client = aws._get_cached_s3_client("us-east-1", "other", "secret")
+    with Stubber(client) as stubber:
+        stubber.add_client_error("list_objects_v2", "AccessDenied")
+        with pytest.raises(ClientError, match="AccessDenied"):
+            aws.get_files_in_s3_path("p/", public_key="other", private_key="secret")
+
+
+def _delete_and_backfill(s3):
+    # Simulate a new process: only the on-disk cache survives.
+    aws._listing_cache.clear()
+    s3.delete_object(Bucket=BUCKET, Key="p/x-20230801")
+    s3.put_object(Bucket=BUCKET, Key="p/x-20230802", Body=b"abc")
+
+
+def test_listing_sees_delete_and_backfill_without_disk_cache(dated_files):
+    _delete_and_backfill(dated_files)
+
+    assert aws.get_files_in_s3_path("p/") == ["p/x-20230802", "p/x-20230803"]
+
+
+def test_disk_listing_sees_delete_and_backfill_after_max_age(dated_files, monkeypatch):
+    monkeypatch.setattr(aws._disk_listing_cache, "MAX_AGE", 3600)
+    aws.invalidate_listing_cache()
+    aws.get_files_in_s3_path("p/")
+    _delete_and_backfill(dated_files)
+
+    # The cached listing is now older than the maximum age.
+    monkeypatch.setattr(aws._disk_listing_cache, "MAX_AGE", 1e-9)
+
+    assert aws.get_files_in_s3_path("p/") == ["p/x-20230802", "p/x-20230803"]
+
+
+def test_disk_listing_sees_appended_files(dated_files, monkeypatch):
+    monkeypatch.setattr(aws._disk_listing_cache, "MAX_AGE", 3600)
+    aws.invalidate_listing_cache()
+    aws.get_files_in_s3_path("p/")
+    aws._listing_cache.clear()
+    dated_files.put_object(Bucket=BUCKET, Key="p/x-20230804", Body=b"abc")
+
+    assert aws.get_files_in_s3_path("p/") == [
+        "p/x-20230801",
+        "p/x-20230803",
+        "p/x-20230804",
+    ]
+
+
+def test_disk_listing_cache_is_not_shared_across_credentials(dated_files, monkeypatch):
+    monkeypatch.setattr(aws._disk_listing_cache, "MAX_AGE", 3600)
+    aws.invalidate_listing_cache()
+    aws.get_files_in_s3_path("p/")
+    aws._listing_cache.clear()
+
+    # The other key set sees an empty prefix, e.g. through a narrower bucket policy.
+    client = aws._get_cached_s3_client("us-east-1", "other", "secret")
+    with Stubber(client) as stubber:
+        stubber.add_response("list_objects_v2", {"IsTruncated": False, "KeyCount": 0})
+        files = aws.get_files_in_s3_path("p/", public_key="other", private_key="secret")
+    assert files == []
+
+
+def test_invalidate_listing_cache_does_not_create_cache_dir(tmp_path):
+    aws.invalidate_listing_cache()
+    aws.invalidate_listing_cache("p/")
+
+    assert not (tmp_path / "cache").exists()
+
+
+@pytest.mark.parametrize("max_age", [0, 3600])
+def test_listing_works_with_unusable_cache_dir(
+    dated_files, tmp_path, monkeypatch, max_age
+):
+    # A regular file where the cache directory should be makes every access fail.
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setenv("ONEUTIL_CACHE_DIR", str(blocker / "cache"))
+    monkeypatch.setattr(aws._disk_listing_cache, "MAX_AGE", max_age)
+    aws.invalidate_listing_cache()
+
+    assert aws.get_files_in_s3_path("p/") == ["p/x-20230801", "p/x-20230803"]
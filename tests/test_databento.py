@@ -0,0 +1,140 @@
+from collections import Counter
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from oneutil.etl import _df_cache, databento
+from oneutil.etl.databento import _filter_table, read_databento_from_s3
+
+from conftest import BUCKET, make_dbn
+
+
+def _put_trades(s3):
+    for day in ("20230801", "20230802", "20230803"):
+        s3.put_object(
+            Bucket=BUCKET,
+            Key=f"trades/{day}.trades.dbn",
+            Body=make_dbn(f"{day[:4]}-{day[4:6]}-{day[6:]}"),
+        )
+    return s3
+
+
+@pytest.fixture
+def trades(s3):
+    return _put_trades(s3)
+
+
+@pytest.mark.parametrize("path", ["trades", "trades/"])
+def test_list_by_day_accepts_trailing_slash(trades, path):
+    df = read_databento_from_s3(
+        path, date(2023, 8, 2), date(2023, 8, 3), list_by_day=True
+    )
+    assert len(df) == 6
+
+
+def test_read_filters_files_by_date(trades):
+    df = read_databento_from_s3("trades/", date(2023, 8, 2), date(2023, 8, 2))
+    assert len(df) == 3
+    assert (df["ts_event"].dt.day == 2).all()
+
+
+@pytest.mark.parametrize("ed, expected", [(date(2023, 8, 1), 8), (date(2023, 8, 3), 4)])
+def test_file_concurrency_depends_on_parallel_downloads(
+    trades, monkeypatch, ed, expected
+):
+    # A single file gets the full per-file limit; three share a pool of 12 connections.
+    monkeypatch.setattr(databento, "MAX_POOL_CONNECTIONS", 12)
+    concurrency = []
+    read_file = databento.read_s3_bucket_file
+
+    def record(*args):
+        concurrency.append(args[-1])
+        return read_file(*args)
+
+    monkeypatch.setattr(databento, "read_s3_bucket_file", record)
+    read_databento_from_s3("trades/", date(2023, 8, 1), ed, max_workers=32)
+    assert set(concurrency) == {expected}
+
+
+def test_read_async_matches_threaded_read(s3_server):
+    pytest.importorskip("aioboto3")
+    _put_trades(s3_server)
+
+    expected = read_databento_from_s3("trades/", date(2023, 8, 1), date(2023, 8, 3))
+    df = read_databento_from_s3(
+        "trades/", date(2023, 8, 1), date(2023, 8, 3), use_async=True
+    )
+    assert len(df) == 9
+    assert df.equals(expected)
+
+
+def test_decode_workers_match_in_thread_decoding(trades):
+    expected = read_databento_from_s3("trades/", date(2023, 8, 1), date(2023, 8, 3))
+    df = read_databento_from_s3(
+        "trades/", date(2023, 8, 1), date(2023, 8, 3), decode_workers=2
+    )
+    assert len(df) == 9
+    assert df.equals(expected)
+
+
+def test_dbn_cache_uses_listed_etags(trades, s3_calls, monkeypatch):
+    monkeypatch.setattr(_df_cache, "ENABLED", True)
+
+    first = read_databento_from_s3("trades/", date(2023, 8, 1), date(2023, 8, 3))
+    assert s3_calls == Counter({"ListObjectsV2": 1, "GetObject": 3})
+
+    s3_calls.clear()
+    second = read_databento_from_s3("trades/", date(2023, 8, 1), date(2023, 8, 3))
+    assert s3_calls == Counter()
+    assert second.equals(first)
+
+
+def test_dbn_cache_falls_back_with_unusable_cache_dir(trades, tmp_path, monkeypatch):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setenv("ONEUTIL_CACHE_DIR", str(blocker / "cache"))
+    monkeypatch.setattr(_df_cache, "ENABLED", True)
+
+    df = read_databento_from_s3("trades/", date(2023, 8, 1), date(2023, 8, 3))
+    assert len(df) == 9
+
+
+def test_read_selects_columns_and_time_range(trades):
+    df = read_databento_from_s3(
+        "trades/",
+        date(2023, 8, 1),
+        date(2023, 8, 3),
+        columns=["price", "size"],
+        start_ts="2023-08-02",
+        end_ts=pd.Timestamp("2023-08-03", tz="UTC"),
+    )
+    assert list(df.columns) == ["price", "size"]
+    assert df["size"].tolist() == [1, 2, 3]
+
+
+@pytest.mark.parametrize("columns", [["price", "ts_recv"], ["price", "nope"]])
+def test_read_rejects_index_and_unknown_columns(trades, columns):
+    with pytest.raises(ValueError, match="Cannot select columns"):
+        read_databento_from_s3(
+            "trades/", date(2023, 8, 1), date(2023, 8, 1), columns=columns
+        )
+
+
+@pytest.mark.parametrize("symbols", [["ESZ3"], "ESZ3"])
+def test_filter_table_by_symbols(symbols):
+    df = pd.DataFrame(
+        {"symbol": ["ESZ3", "NQZ3", "ESZ3"], "price": [1, 2, 3]},
+        index=pd.Index([10, 11, 12], name="ts_recv"),
+    )
+
+    table = _filter_table(pa.Table.from_pandas(df), symbols=symbols)
+    assert table.to_pandas()["price"].tolist() == [1, 3]
+
+
+def test_filter_table_by_symbols_requires_symbol_column():
+    df = pd.DataFrame({"price": [1, 2]}, index=pd.Index([10, 11], name="ts_recv"))
+
+    with pytest.raises(ValueError, match="no symbol column"):
+        _filter_table(pa.Table.from_pandas(df), symbols=["ESZ3"])
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+from oneutil.etl.util import (
+    _parse_date,
+    extract_date_from_filename,
+    extract_date_from_string,
+    filter_files_by_date,
+)
+
+AUGUST = (date(2023, 8, 1), date(2023, 8, 31))
+
+
+@pytest.mark.parametrize(
+    "format, filenames",
+    [
+        ("default", ["a_20230731.dbn", "a_20230801.dbn", "a_20230831.dbn", "b.dbn"]),
+        (
+            "hyphen",
+            ["a_2023-07-31.dbn", "a_2023-08-01.dbn", "a_2023-08-31.dbn", "b.dbn"],
+        ),
+        (
+            "underscore",
+            ["a_2023_07_31.dbn", "a_2023_08_01.dbn", "a_2023_08_31.dbn", "b.dbn"],
+        ),
+    ],
+)
+def test_filter_files_by_date_formats(format, filenames):
+    assert filter_files_by_date(filenames, *AUGUST, format) == filenames[1:3]
+
+
+def test_filter_files_by_date_drops_invalid_dates_in_range():
+    # 20230231 is between 20230201 and 20230301 as an integer but not a calendar date.
+    filenames = ["a_20230231.dbn", "a_20230228.dbn"]
+    assert filter_files_by_date(filenames, date(2023, 2, 1), date(2023, 3, 1)) == [
+        "a_20230228.dbn"
+    ]
+
+
+def test_filter_files_by_date_empty_and_unknown_format():
+    assert filter_files_by_date([], *AUGUST) == []
+    assert filter_files_by_date(["a_20230801.dbn"], *AUGUST, "slash") == []
+
+
+def test_parse_date_returns_none_for_invalid_digits():
+    assert _parse_date("20230801", 0, 4, 6) == date(2023, 8, 1)
+    assert _parse_date("20230231", 0, 4, 6) is None
+    assert _parse_date("20231301", 0, 4, 6) is None
+
+
+@pytest.mark.parametrize(
+    "filename, format, expected",
+    [
+        ("report_20230801.csv", "default", date(2023, 8, 1)),
+        ("report_2023-08-01.csv", "hyphen", date(2023, 8, 1)),
+        ("report_2023_08_01.csv", "underscore", date(2023, 8, 1)),
+        ("report_20230231.csv", "default", None),
+        ("report.csv", "default", None),
+        ("report_20230801.csv", "slash", None),
+    ],
+)
+def test_extract_date_from_string(filename, format, expected):
+    assert extract_date_from_string(filename, format) == expected
+
+
+def test_extract_date_from_filename_is_default_format():
+    assert extract_date_from_filename("report_20230801.csv") == date(2023, 8, 1)
+    assert extract_date_from_filename("report_2023-08-01.csv") is None